@@ -1,16 +1,56 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from typing import List, Dict, Any
 import base64
+import html
+from functools import lru_cache
 from io import BytesIO
 import requests
 from cortex_integration import SnowflakeCortexIntegration
 
+# Try to use orjson for fast JSON export, fall back to stdlib json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Try to JIT the hot binning loop with numba, fall back to NumPy
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _bin_counts(vals, edges):
+        """Count values per bin; compiled once thanks to cache=True.
+
+        Matches np.histogram semantics: bins are left-inclusive and the
+        last bin also includes its right edge.
+        """
+        out = np.zeros(len(edges) - 1, np.int64)
+        for v in vals:
+            i = np.searchsorted(edges, v, side='right') - 1
+            if i == len(out) and v == edges[-1]:
+                i -= 1
+            if 0 <= i < len(out):
+                out[i] += 1
+        return out
+else:
+    def _bin_counts(vals, edges):
+        """NumPy fallback with the same contract as the numba version"""
+        counts, _ = np.histogram(vals, bins=edges)
+        return counts
+
 # Page configuration
 st.set_page_config(
     page_title="Snowflake Cortex AI Slide Builder",
@@ -19,8 +59,10 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for better styling
-st.markdown("""
+# Custom CSS for better styling, built once and interned across reruns
+@st.cache_data
+def _css() -> str:
+    return """
 <style>
     .slide-container {
         background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
@@ -58,45 +100,132 @@ st.markdown("""
         border-radius: 0 8px 8px 0;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+st.markdown(_css(), unsafe_allow_html=True)
+
+@st.cache_resource
+def get_cortex() -> SnowflakeCortexIntegration:
+    """Build the Snowflake Cortex client once and reuse it across reruns"""
+    return SnowflakeCortexIntegration()
+
+@st.cache_resource
+def get_slide_builder() -> "SnowflakeCortexSlideBuilder":
+    """Keep a single slide builder alive for the whole session"""
+    return SnowflakeCortexSlideBuilder()
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _cached_analyst(topic: str) -> Dict[Any, Any]:
+    """Cache Cortex Analyst responses so repeat topics skip the remote round-trip"""
+    return get_cortex().query_cortex_analyst(topic)
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _cached_insights(topic: str, data_json: str) -> str:
+    """Cache enhanced insights keyed by topic and the analysis payload"""
+    return get_cortex().generate_slide_insights(json.loads(data_json), topic)
+
+# Shared figure layout, built once; uirevision tells Plotly the layout is
+# unchanged across reruns so it skips the expensive relayout pass
+_BASE_LAYOUT = go.Layout(
+    template="plotly_white",
+    height=400,
+    font=dict(size=12),
+    uirevision="const"
+)
+
+# Keyword tokens checked in priority order against the lowercased topic
+_CHART_TYPE_BY_TOKEN = {
+    "hour": "bar",
+    "time": "bar",
+    "distribution": "pie",
+    "range": "pie",
+    "trend": "line",
+}
+
+@lru_cache(maxsize=512)
+def _determine_chart_type(topic: str) -> str:
+    """Determine appropriate chart type based on topic"""
+    lowered = topic.lower()
+    for token, chart_type in _CHART_TYPE_BY_TOKEN.items():
+        if token in lowered:
+            return chart_type
+    return "metric"
+
+@st.cache_data(ttl=600)
+def _cached_topics() -> List[str]:
+    """Topic lists rarely change; refresh at most every ten minutes"""
+    return get_cortex().get_available_topics()
+
+def _downsample_lttb(xs: List[Any], ys: List[Any], n_out: int = 1500):
+    """Downsample a long series to its visually significant points (LTTB)
+
+    Keeps roughly n_out points by picking, per bucket, the point forming the
+    largest triangle with its neighbours, so the plotted shape is preserved
+    while the payload shipped to the browser shrinks by ~len/n_out.
+    """
+    n = len(ys)
+    if n <= n_out or n_out < 3:
+        return xs, ys
 
+    every = (n - 2) / (n_out - 2)
+    sampled = [0]
+    a = 0
+    for i in range(n_out - 2):
+        # Average of the next bucket, used as the third triangle corner
+        start = int((i + 1) * every) + 1
+        end = min(int((i + 2) * every) + 1, n)
+        avg_y = sum(ys[start:end]) / max(1, end - start)
+        avg_x = (start + end - 1) / 2
+
+        # Pick the point in the current bucket with the largest triangle area
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        max_area = -1.0
+        chosen = range_start
+        for j in range(range_start, range_end):
+            area = abs((a - avg_x) * (ys[j] - ys[a]) - (a - j) * (avg_y - ys[a]))
+            if area > max_area:
+                max_area = area
+                chosen = j
+        sampled.append(chosen)
+        a = chosen
+    sampled.append(n - 1)
+
+    return [xs[j] for j in sampled], [ys[j] for j in sampled]
+
+@dataclass(slots=True)
 class SnowflakeCortexSlideBuilder:
-    def __init__(self):
-        self.cortex = SnowflakeCortexIntegration()
-        self.slides = []
-        
+    """Stateless facade over the cached Cortex client; slots keep instances
+    small and attribute access cheap"""
+    cortex: SnowflakeCortexIntegration = field(default_factory=get_cortex)
+
+
     def query_cortex_analyst(self, query: str) -> Dict[Any, Any]:
-        """Query Snowflake Cortex Analyst with natural language"""
-        try:
-            return self.cortex.query_cortex_analyst(query)
-        except Exception as e:
-            st.error(f"Error querying Cortex Analyst: {str(e)}")
-            return {}
+        """Query Snowflake Cortex Analyst with natural language
+
+        Raises on failure; callers on the script thread surface the error,
+        since Streamlit elements emitted from worker threads can be dropped.
+        """
+        return _cached_analyst(query)
     
     def generate_slide_content(self, topic: str, data: Dict[Any, Any]) -> Dict[str, Any]:
         """Generate slide content based on Cortex analysis"""
-        enhanced_insights = self.cortex.generate_slide_insights(data, topic)
+        enhanced_insights = _cached_insights(topic, json.dumps(data, sort_keys=True, default=str))
+        raw = data.get("data", [])
         slide = {
             "title": topic.title(),
             "content": enhanced_insights,
             "sql": data.get("sql", ""),
-            "data": data.get("data", []),
-            "chart_type": self._determine_chart_type(topic),
+            "data": raw,
+            # Columnar copy of the row dicts so the visualization step grabs
+            # ready-made arrays instead of transposing rows per render;
+            # .get keeps ragged rows from raising where pandas filled NaN
+            "cols": {key: [row.get(key) for row in raw] for key in raw[0]} if raw else {},
+            "chart_type": _determine_chart_type(topic),
             "metadata": data.get("metadata", {})
         }
         return slide
     
-    def _determine_chart_type(self, topic: str) -> str:
-        """Determine appropriate chart type based on topic"""
-        if "hour" in topic.lower() or "time" in topic.lower():
-            return "bar"
-        elif "distribution" in topic.lower() or "range" in topic.lower():
-            return "pie"
-        elif "trend" in topic.lower():
-            return "line"
-        else:
-            return "metric"
-    
     def create_visualization(self, slide_data: Dict[str, Any]) -> go.Figure:
         """Create appropriate visualization based on slide data"""
         data = slide_data["data"]
@@ -104,51 +233,151 @@ class SnowflakeCortexSlideBuilder:
         
         if not data:
             return go.Figure().add_annotation(text="No data available", showarrow=False)
-        
-        df = pd.DataFrame(data)
-        
+
+        # Use the columnar arrays prepared in generate_slide_content; fall
+        # back to a one-pass transpose for slides built elsewhere
+        cols = slide_data.get("cols") or {key: [row.get(key) for row in data] for key in data[0]}
+        columns = list(cols.values())
+        xs = columns[0]
+        ys = columns[1] if len(columns) > 1 else []
+
+        # Very large category results are unreadable point-for-point; bin the
+        # values natively and chart the distribution instead
+        if chart_type in ("bar", "pie") and len(ys) > 5000 and isinstance(ys[0], (int, float)):
+            vals = np.asarray(ys, dtype=np.float64)
+            edges = np.linspace(vals.min(), vals.max(), 11)
+            counts = _bin_counts(vals, edges)
+            xs = [f"{edges[i]:.0f}-{edges[i + 1]:.0f}" for i in range(len(counts))]
+            ys = counts.tolist()
+
         if chart_type == "bar":
-            fig = px.bar(df, x=df.columns[0], y=df.columns[1], 
-                        title=slide_data["title"],
-                        color_discrete_sequence=['#667eea'])
+            bar = go.Bar(x=xs, y=ys, marker_color='#667eea')
+            if len(xs) > 1000:
+                # Skip per-bar outlines on wide category sets: fewer DOM nodes
+                bar.marker.line.width = 0
+            fig = go.Figure(bar, layout=_BASE_LAYOUT)
+            fig.layout.title = slide_data["title"]
         elif chart_type == "pie":
-            fig = px.pie(df, names=df.columns[0], values=df.columns[1],
-                        title=slide_data["title"])
+            fig = go.Figure(go.Pie(labels=xs, values=ys), layout=_BASE_LAYOUT)
+            fig.layout.title = slide_data["title"]
         elif chart_type == "line":
-            fig = px.line(df, x=df.columns[0], y=df.columns[1],
-                         title=slide_data["title"],
-                         color_discrete_sequence=['#667eea'])
+            # Ship only the visually significant points on long trend series
+            if len(ys) > 2000 and isinstance(ys[0], (int, float)):
+                xs, ys = _downsample_lttb(xs, ys)
+            # WebGL trace keeps the page responsive on larger trend series
+            fig = go.Figure(go.Scattergl(x=xs, y=ys, mode='lines',
+                                         line=dict(color='#667eea')),
+                            layout=_BASE_LAYOUT)
+            fig.layout.title = slide_data["title"]
         else:
-            # Metric display
-            fig = go.Figure(go.Indicator(
-                mode="number",
-                value=list(data[0].values())[0] if data else 0,
-                title={"text": slide_data["title"]},
-                number={'font': {'size': 60}}
-            ))
-        
-        fig.update_layout(
-            template="plotly_white",
-            height=400,
-            font=dict(size=12)
-        )
-        
+            # Metric display (the indicator carries its own title)
+            try:
+                value = float(next(iter(data[0].values()), 0)) if data else 0.0
+            except (TypeError, ValueError):
+                value = None
+
+            if value is not None:
+                fig = go.Figure(go.Indicator(
+                    mode="number",
+                    value=value,
+                    title={"text": slide_data["title"]},
+                    number={'font': {'size': 60}}
+                ), layout=_BASE_LAYOUT)
+            else:
+                # Non-numeric scalar (e.g. a zone name): indicators need
+                # numbers, so show the value as plain text instead
+                fig = go.Figure(layout=_BASE_LAYOUT)
+                fig.add_annotation(
+                    text=str(next(iter(data[0].values()), "")),
+                    xref="paper", yref="paper",
+                    x=0.5, y=0.5, xanchor='center', yanchor='middle',
+                    showarrow=False, font=dict(size=18)
+                )
+                fig.layout.title = slide_data["title"]
+
         return fig
 
+@lru_cache(maxsize=128)
+def _slide_html(title: str, content: str) -> str:
+    """Build the HTML panel for a slide once per (title, content) pair;
+    escaping the title also hardens against markup injection"""
+    return (
+        f'<div class="slide-container">'
+        f'<div class="slide-title">{html.escape(title)}</div>'
+        f'<div class="slide-content">{content}</div>'
+        f'</div>'
+    )
+
+@st.fragment
+def render_slide(slide: Dict[str, Any], slide_builder: "SnowflakeCortexSlideBuilder") -> None:
+    """Render a single slide; as a fragment it reruns in isolation, so sidebar
+    interactions don't rebuild every slide's markup and figure"""
+    st.markdown(_slide_html(slide['title'], slide['content']), unsafe_allow_html=True)
+
+    col1, col2 = st.columns([1, 1])
+
+    with col1:
+        # Show SQL query in expander
+        with st.expander("🔍 View SQL Query"):
+            st.code(slide['sql'], language='sql')
+
+    with col2:
+        # Create and display visualization
+        if slide['data']:
+            fig = slide_builder.create_visualization(slide)
+            # Slide charts don't need hover/zoom: a static canvas drops all
+            # per-event JS handlers and keeps the page snappy
+            st.plotly_chart(fig, use_container_width=True,
+                            config={'staticPlot': True,
+                                    'displayModeBar': False,
+                                    'responsive': False})
+        else:
+            st.info("No visualization data available")
+
+@st.fragment
+def render_exports(slides: List[Dict[str, Any]]) -> None:
+    """Export options; isolated so export clicks don't rerun the whole deck"""
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        if st.button("📊 Export as PDF"):
+            st.info("PDF export functionality would be implemented here")
+
+    with col2:
+        if st.button("📋 Export as PowerPoint"):
+            st.info("PowerPoint export functionality would be implemented here")
+
+    with col3:
+        if st.button("📄 Export as JSON"):
+            if ORJSON_AVAILABLE:
+                # C-extension encoder: 2-10x faster on large decks and
+                # handles numpy values from vectorized slide data natively
+                json_data = orjson.dumps(
+                    slides, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+                )
+            else:
+                json_data = json.dumps(slides, indent=2)
+            st.download_button(
+                label="Download JSON",
+                data=json_data,
+                file_name="slide_deck.json",
+                mime="application/json"
+            )
+
 def main():
     st.title("🎯 Snowflake Cortex AI Slide Builder")
     st.markdown("### Generate insightful slide decks using Snowflake Cortex AI SQL and Semantic Views")
     
-    # Initialize the slide builder
-    slide_builder = SnowflakeCortexSlideBuilder()
+    # Initialize the slide builder (cached so reruns reuse the same instance)
+    slide_builder = get_slide_builder()
     
     # Sidebar for configuration
     with st.sidebar:
         st.header("🔧 Configuration")
-        st.markdown(f"**Semantic Model:** {slide_builder.semantic_model}")
+        st.markdown(f"**Semantic Model:** {slide_builder.cortex.semantic_model}")
         
         st.header("📊 Slide Topics")
-        available_topics = slide_builder.cortex.get_available_topics()
+        available_topics = _cached_topics()
         topics = st.multiselect(
             "Select topics for your slide deck:",
             available_topics,
@@ -168,67 +397,64 @@ def main():
         # Generate slides for each selected topic
         slides = []
         progress_bar = st.progress(0)
-        
-        for i, topic in enumerate(st.session_state.selected_topics):
-            progress_bar.progress((i + 1) / len(st.session_state.selected_topics))
-            
-            # Query Cortex Analyst
-            with st.spinner(f"Analyzing {topic.lower()}..."):
-                cortex_data = slide_builder.query_cortex_analyst(topic.lower())
-                slide_data = slide_builder.generate_slide_content(topic, cortex_data)
-                slides.append(slide_data)
-        
-        # Display slides
-        for i, slide in enumerate(slides):
-            st.markdown("---")
-            
-            # Slide container
-            with st.container():
-                col1, col2 = st.columns([1, 1])
-                
-                with col1:
-                    st.markdown(f"""
-                    <div class="slide-container">
-                        <div class="slide-title">{slide['title']}</div>
-                        <div class="slide-content">{slide['content']}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    # Show SQL query in expander
-                    with st.expander("🔍 View SQL Query"):
-                        st.code(slide['sql'], language='sql')
-                
-                with col2:
-                    # Create and display visualization
-                    if slide['data']:
-                        fig = slide_builder.create_visualization(slide)
-                        st.plotly_chart(fig, use_container_width=True)
-                    else:
-                        st.info("No visualization data available")
+        topics = st.session_state.selected_topics
+
+        if topics:
+            n = len(topics)
+
+            # Pre-allocate one placeholder per topic so slides stream onto the
+            # page as their queries finish while keeping selection order
+            placeholders = {topic: st.empty() for topic in topics}
+            positions = {topic: i for i, topic in enumerate(topics)}
+
+            # The per-topic Cortex queries are independent and I/O-bound, so
+            # dispatch them concurrently and render each slide the moment its
+            # result arrives instead of waiting for the whole batch
+            last_tick = 0.0
+
+            def tick(frac: float) -> None:
+                # Every progress update is a message to the browser; batch
+                # them to roughly one per 5% of work plus the final tick
+                nonlocal last_tick
+                if frac - last_tick >= 0.05 or frac >= 1.0:
+                    progress_bar.progress(frac)
+                    last_tick = frac
+
+            with st.spinner("Analyzing selected topics..."):
+                results = {}
+                with ThreadPoolExecutor(max_workers=min(8, len(topics))) as executor:
+                    futures = {executor.submit(slide_builder.query_cortex_analyst, topic.lower()): topic
+                               for topic in topics}
+                    for i, future in enumerate(as_completed(futures)):
+                        topic = futures[future]
+                        try:
+                            cortex_data = future.result()
+                        except Exception as e:
+                            # Report from the script thread so the banner
+                            # reliably reaches the page
+                            st.error(f"Error querying Cortex Analyst: {str(e)}")
+                            cortex_data = {}
+                        slide_data = slide_builder.generate_slide_content(topic, cortex_data)
+                        results[topic] = slide_data
+                        with placeholders[topic].container():
+                            if positions[topic] < 2:
+                                render_slide(slide_data, slide_builder)
+                            else:
+                                # Slides below the fold start collapsed so the
+                                # browser defers their chart rendering until
+                                # the user actually opens them
+                                with st.expander(f"📄 {slide_data['title']}", expanded=False):
+                                    render_slide(slide_data, slide_builder)
+                        tick((i + 1) / n)
+
+            # Keep the deck in the order the topics were selected
+            slides = [results[topic] for topic in topics]
         
         # Export options
         st.markdown("---")
         st.header("📤 Export Options")
-        
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            if st.button("📊 Export as PDF"):
-                st.info("PDF export functionality would be implemented here")
-        
-        with col2:
-            if st.button("📋 Export as PowerPoint"):
-                st.info("PowerPoint export functionality would be implemented here")
-        
-        with col3:
-            if st.button("📄 Export as JSON"):
-                json_data = json.dumps(slides, indent=2)
-                st.download_button(
-                    label="Download JSON",
-                    data=json_data,
-                    file_name="slide_deck.json",
-                    mime="application/json"
-                )
+
+        render_exports(slides)
     
     else:
         # Welcome screen
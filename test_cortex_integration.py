@@ -4,260 +4,341 @@ Test script for Snowflake Cortex AI Slide Builder
 This script tests the core functionality without requiring a full Streamlit environment
 """
 
+import io
 import json
+import functools
 import sys
 import traceback
-from typing import Dict, Any
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import redirect_stdout
 
+# Heavy imports hoisted to module scope so each test function stops
+# re-entering the import machinery; a failure is re-raised inside the
+# tests that actually need the libraries
+try:
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    # Shared layout template: figure constructors deep-copy the default
+    # template on every call, so reusing one small template object trims
+    # per-figure construction cost in the chart tests
+    _TEMPLATE = go.layout.Template(layout=dict(font=dict(size=12)))
+    _IMPORT_ERR = None
+except ImportError as _e:
+    _IMPORT_ERR = _e
+
+# Prefer orjson's C encoder for the export fixtures, mirroring the apps;
+# orjson handles datetimes natively so default=str isn't needed there
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, indent=2, default=str)
+
+    _loads = json.loads
+
+def _test_suite(label):
+    """Wrap a test body with the shared failure-report scaffold"""
+    def decorator(test_func):
+        @functools.wraps(test_func)
+        def wrapper():
+            try:
+                return test_func()
+            except Exception as e:
+                print(f"❌ {label} test failed: {str(e)}")
+                traceback.print_exc()
+                return False
+        return wrapper
+    return decorator
+
+@_test_suite("Cortex integration")
 def test_cortex_integration():
     """Test the Cortex integration module"""
-    try:
-        from cortex_integration import SnowflakeCortexIntegration
-        
-        print("🧪 Testing Snowflake Cortex Integration...")
-        cortex = SnowflakeCortexIntegration()
-        
-        # Test basic initialization
-        print(f"✅ Semantic Model: {cortex.semantic_model}")
-        print(f"✅ Search Service: {cortex.search_service}")
-        print(f"✅ Database: {cortex.database}.{cortex.schema}")
-        
-        # Test query functionality
-        print("\n🔍 Testing Cortex Analyst queries...")
-        test_queries = [
-            "traffic overview",
-            "peak traffic hours", 
-            "speed distribution",
-            "geographic analysis",
-            "seasonal trends"
-        ]
-        
-        results = {}
-        for query in test_queries:
-            print(f"  📊 Analyzing: {query}")
-            result = cortex.query_cortex_analyst(query)
-            results[query] = result
-            
-            # Validate result structure
-            assert "sql" in result, f"Missing SQL in result for {query}"
-            assert "data" in result, f"Missing data in result for {query}"
-            assert "insights" in result, f"Missing insights in result for {query}"
-            
-            print(f"    ✅ Generated {len(result['data'])} data points")
-            print(f"    ✅ SQL: {result['sql'][:50]}...")
-            print(f"    ✅ Insights: {result['insights'][:80]}...")
-        
-        # Test insight generation
-        print("\n🤖 Testing insight generation...")
-        for query, data in results.items():
-            enhanced_insights = cortex.generate_slide_insights(data, query)
-            assert len(enhanced_insights) > len(data.get('insights', '')), f"Enhanced insights not generated for {query}"
-            print(f"  ✅ Enhanced insights for {query}: {len(enhanced_insights)} characters")
-        
-        # Test topic availability
-        print("\n📋 Testing available topics...")
-        topics = cortex.get_available_topics()
-        assert len(topics) > 0, "No topics available"
-        print(f"  ✅ Available topics: {len(topics)}")
-        for topic in topics:
-            print(f"    • {topic}")
-        
-        # Test connection validation
-        print("\n🔗 Testing connection validation...")
-        is_connected = cortex.validate_connection()
-        print(f"  ✅ Connection status: {'Connected' if is_connected else 'Demo Mode'}")
-        
-        print("\n🎉 All Cortex integration tests passed!")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Cortex integration test failed: {str(e)}")
-        traceback.print_exc()
-        return False
+    from cortex_integration import SnowflakeCortexIntegration
+    
+    print("🧪 Testing Snowflake Cortex Integration...")
+    cortex = SnowflakeCortexIntegration()
+
+    # Memoize the bound query method for the rest of this test; the
+    # results dict covers the first pass, this guards later phases from
+    # re-paying a Cortex round-trip for a query already answered
+    _cached_query = functools.lru_cache(maxsize=None)(cortex.query_cortex_analyst)
+    
+    # Test basic initialization
+    print(f"✅ Semantic Model: {cortex.semantic_model}")
+    print(f"✅ Search Service: {cortex.search_service}")
+    print(f"✅ Database: {cortex.database}.{cortex.schema}")
+    
+    # Test query functionality
+    print("\n🔍 Testing Cortex Analyst queries...")
+    test_queries = [
+        "traffic overview",
+        "peak traffic hours", 
+        "speed distribution",
+        "geographic analysis",
+        "seasonal trends"
+    ]
+    
+    # The queries are independent and I/O-bound, so fan them out across
+    # threads and keep assertions/printing on the main thread for
+    # deterministic output
+    with ThreadPoolExecutor(max_workers=len(test_queries)) as executor:
+        futures = {query: executor.submit(_cached_query, query)
+                   for query in test_queries}
+        results = {query: future.result() for query, future in futures.items()}
+
+    for query, result in results.items():
+        print(f"  📊 Analyzing: {query}")
+
+        # Validate result structure
+        assert "sql" in result, f"Missing SQL in result for {query}"
+        assert "data" in result, f"Missing data in result for {query}"
+        assert "insights" in result, f"Missing insights in result for {query}"
+
+        print(f"    ✅ Generated {len(result['data'])} data points")
+        print(f"    ✅ SQL: {result['sql'][:50]}...")
+        print(f"    ✅ Insights: {result['insights'][:80]}...")
 
+    # Test insight generation, fanned out the same way since it only
+    # depends on the already-computed results
+    print("\n🤖 Testing insight generation...")
+    with ThreadPoolExecutor(max_workers=len(results)) as executor:
+        insight_futures = {query: executor.submit(cortex.generate_slide_insights, data, query)
+                           for query, data in results.items()}
+        enhanced = {query: future.result() for query, future in insight_futures.items()}
+
+    # One vectorized comparison instead of a per-query Python check;
+    # the smallest margin names the offender if it ever fails
+    import numpy as np
+    queries = list(enhanced.keys())
+    base_lens = np.fromiter((len(results[q].get('insights', '')) for q in queries), dtype=np.int64)
+    enhanced_lens = np.fromiter((len(enhanced[q]) for q in queries), dtype=np.int64)
+    assert (enhanced_lens > base_lens).all(), \
+        f"Enhanced insights not generated for {queries[int(np.argmin(enhanced_lens - base_lens))]}"
+
+    for query, enhanced_insights in enhanced.items():
+        print(f"  ✅ Enhanced insights for {query}: {len(enhanced_insights)} characters")
+    
+    # Test topic availability
+    print("\n📋 Testing available topics...")
+    topics = cortex.get_available_topics()
+    assert len(topics) > 0, "No topics available"
+    print(f"  ✅ Available topics: {len(topics)}")
+    for topic in topics:
+        print(f"    • {topic}")
+    
+    # Test connection validation
+    print("\n🔗 Testing connection validation...")
+    is_connected = cortex.validate_connection()
+    print(f"  ✅ Connection status: {'Connected' if is_connected else 'Demo Mode'}")
+    
+    print("\n🎉 All Cortex integration tests passed!")
+    return True
+    
+
+@_test_suite("Slide builder")
 def test_slide_builder():
     """Test the slide builder functionality"""
-    try:
-        print("\n🧪 Testing Slide Builder functionality...")
-        
-        # Test imports
-        import pandas as pd
-        import plotly.express as px
-        import plotly.graph_objects as go
-        print("✅ All visualization libraries imported")
-        
-        # Test basic slide building logic
-        from real_cortex_app import RealCortexSlideBuilder
-        
-        builder = RealCortexSlideBuilder()
-        print(f"✅ Slide builder initialized")
-        print(f"  • Semantic model: {builder.semantic_model}")
-        print(f"  • Search service: {builder.search_service}")
-        
-        # Test query processing
-        print("\n📊 Testing slide generation...")
-        test_query = "traffic overview"
-        cortex_result = builder.query_cortex_analyst(test_query)
-        
-        assert cortex_result is not None, "No result from Cortex query"
-        print(f"  ✅ Query result received: {len(cortex_result)} fields")
-        
-        # Test visualization creation
-        print("\n📈 Testing visualization creation...")
-        slide_data = {
-            "title": "Test Slide",
-            "data": [
-                {"hour": 8, "count": 1250},
-                {"hour": 17, "count": 1180},
-                {"hour": 9, "count": 1020}
-            ],
-            "chart_type": "bar"
-        }
-        
-        fig = builder.create_enhanced_visualization(slide_data)
-        assert fig is not None, "No visualization created"
-        print(f"  ✅ Visualization created successfully")
-        
-        # Test confidence badge
-        print("\n🎯 Testing confidence scoring...")
-        for confidence in [0.95, 0.75, 0.45]:
-            badge = builder.get_confidence_badge(confidence)
-            assert badge is not None and len(badge) > 0, f"No badge for confidence {confidence}"
-            print(f"  ✅ Confidence {confidence:.0%}: {badge[:30]}...")
-        
-        print("\n🎉 All slide builder tests passed!")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Slide builder test failed: {str(e)}")
-        traceback.print_exc()
-        return False
+    print("\n🧪 Testing Slide Builder functionality...")
+    
+    # Visualization libraries are imported at module scope
+    if _IMPORT_ERR:
+        raise _IMPORT_ERR
+    print("✅ All visualization libraries imported")
+    
+    # Test basic slide building logic
+    from real_cortex_app import RealCortexSlideBuilder
+    
+    builder = RealCortexSlideBuilder()
+    print(f"✅ Slide builder initialized")
+    print(f"  • Semantic model: {builder.semantic_model}")
+    print(f"  • Search service: {builder.search_service}")
+    
+    # Test query processing
+    print("\n📊 Testing slide generation...")
+    test_query = "traffic overview"
+    cortex_result = builder.query_cortex_analyst(test_query)
+    
+    assert cortex_result is not None, "No result from Cortex query"
+    print(f"  ✅ Query result received: {len(cortex_result)} fields")
+    
+    # Test visualization creation
+    print("\n📈 Testing visualization creation...")
+    slide_data = {
+        "title": "Test Slide",
+        "data": [
+            {"hour": 8, "count": 1250},
+            {"hour": 17, "count": 1180},
+            {"hour": 9, "count": 1020}
+        ],
+        "chart_type": "bar"
+    }
+    
+    fig = builder.create_enhanced_visualization(slide_data)
+    assert fig is not None, "No visualization created"
+    print(f"  ✅ Visualization created successfully")
+    
+    # Test confidence badge, evaluated as one batch over the array
+    print("\n🎯 Testing confidence scoring...")
+    import numpy as np
+    confidences = np.array([0.95, 0.75, 0.45])
+    badges = np.vectorize(builder.get_confidence_badge, otypes=[object])(confidences)
+    assert all(badge and len(badge) > 0 for badge in badges), "Missing confidence badge"
+    for confidence, badge in zip(confidences, badges):
+        print(f"  ✅ Confidence {confidence:.0%}: {badge[:30]}...")
+    
+    print("\n🎉 All slide builder tests passed!")
+    return True
+    
 
+@_test_suite("Data processing")
 def test_data_processing():
     """Test data processing and visualization logic"""
-    try:
-        print("\n🧪 Testing Data Processing...")
-        
-        import pandas as pd
-        import plotly.express as px
-        import plotly.graph_objects as go
-        
-        # Test sample data processing
-        sample_data = [
-            {"hour": 8, "traffic_count": 12500, "avg_speed_mph": 35.2},
-            {"hour": 17, "traffic_count": 11800, "avg_speed_mph": 32.8},
-            {"hour": 9, "traffic_count": 10200, "avg_speed_mph": 42.1}
-        ]
-        
-        df = pd.DataFrame(sample_data)
-        assert len(df) == 3, "DataFrame creation failed"
-        print(f"  ✅ DataFrame created with {len(df)} rows")
-        
-        # Test chart creation
-        fig = px.bar(df, x="hour", y="traffic_count", title="Test Chart")
-        assert fig is not None, "Chart creation failed"
-        print(f"  ✅ Bar chart created successfully")
-        
-        # Test pie chart
-        pie_data = [
-            {"speed_range": "0-20 mph", "count": 25000},
-            {"speed_range": "21-40 mph", "count": 45000},
-            {"speed_range": "41-60 mph", "count": 55000}
-        ]
-        
-        df_pie = pd.DataFrame(pie_data)
-        fig_pie = px.pie(df_pie, names="speed_range", values="count", title="Speed Distribution")
-        assert fig_pie is not None, "Pie chart creation failed"
-        print(f"  ✅ Pie chart created successfully")
-        
-        # Test gauge chart
-        fig_gauge = go.Figure(go.Indicator(
-            mode="number+gauge",
-            value=42.7,
-            title={"text": "Average Speed"},
-            gauge={'axis': {'range': [0, 80]}}
-        ))
-        assert fig_gauge is not None, "Gauge chart creation failed"
-        print(f"  ✅ Gauge chart created successfully")
-        
-        print("\n🎉 All data processing tests passed!")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Data processing test failed: {str(e)}")
-        traceback.print_exc()
-        return False
+    print("\n🧪 Testing Data Processing...")
+
+    if _IMPORT_ERR:
+        raise _IMPORT_ERR
+
+    def build_df(rows):
+        """from_records with PyArrow-backed dtypes where pandas supports
+        it; columnar storage is zero-copy into the chart layer"""
+        df = pd.DataFrame.from_records(rows, columns=list(rows[0].keys()))
+        try:
+            return df.convert_dtypes(dtype_backend="pyarrow")
+        except (ImportError, TypeError):
+            return df
+
+    # Test sample data processing
+    sample_data = [
+        {"hour": 8, "traffic_count": 12500, "avg_speed_mph": 35.2},
+        {"hour": 17, "traffic_count": 11800, "avg_speed_mph": 32.8},
+        {"hour": 9, "traffic_count": 10200, "avg_speed_mph": 42.1}
+    ]
+
+    df = build_df(sample_data)
+    assert len(df) == 3, "DataFrame creation failed"
+    print(f"  ✅ DataFrame created with {len(df)} rows")
+    
+    # Test chart creation
+    fig = px.bar(df, x="hour", y="traffic_count", title="Test Chart",
+                 template=_TEMPLATE)
+    assert fig is not None, "Chart creation failed"
+    print(f"  ✅ Bar chart created successfully")
+    
+    # Test pie chart
+    pie_data = [
+        {"speed_range": "0-20 mph", "count": 25000},
+        {"speed_range": "21-40 mph", "count": 45000},
+        {"speed_range": "41-60 mph", "count": 55000}
+    ]
+    
+    df_pie = build_df(pie_data)
+    fig_pie = px.pie(df_pie, names="speed_range", values="count", title="Speed Distribution",
+                     template=_TEMPLATE)
+    assert fig_pie is not None, "Pie chart creation failed"
+    print(f"  ✅ Pie chart created successfully")
+    
+    # Test gauge chart
+    fig_gauge = go.Figure(go.Indicator(
+        mode="number+gauge",
+        value=42.7,
+        title={"text": "Average Speed"},
+        gauge={'axis': {'range': [0, 80]}}
+    ), layout=go.Layout(template=_TEMPLATE))
+    assert fig_gauge is not None, "Gauge chart creation failed"
+    print(f"  ✅ Gauge chart created successfully")
+    
+    print("\n🎉 All data processing tests passed!")
+    return True
+    
 
+@_test_suite("Export functionality")
 def test_export_functionality():
     """Test export and serialization functionality"""
-    try:
-        print("\n🧪 Testing Export Functionality...")
-        
-        # Test JSON serialization
-        sample_slides = [
-            {
-                "title": "Traffic Overview",
-                "content": "Test content",
-                "sql": "SELECT COUNT(*) FROM traffic_data",
-                "data": [{"total_records": 150000}],
-                "metadata": {"confidence": 0.95}
-            },
-            {
-                "title": "Peak Hours",
-                "content": "Peak analysis",
-                "sql": "SELECT HOUR(timestamp) FROM traffic_data",
-                "data": [{"hour": 8, "count": 12500}],
-                "metadata": {"confidence": 0.88}
-            }
-        ]
-        
-        # Test JSON export
-        json_data = json.dumps(sample_slides, indent=2, default=str)
-        assert len(json_data) > 0, "JSON serialization failed"
-        print(f"  ✅ JSON export: {len(json_data)} characters")
-        
-        # Test JSON parsing
-        parsed_data = json.loads(json_data)
-        assert len(parsed_data) == 2, "JSON parsing failed"
-        print(f"  ✅ JSON parsing: {len(parsed_data)} slides recovered")
-        
-        # Test data validation
-        for slide in parsed_data:
-            required_fields = ["title", "content", "sql", "data", "metadata"]
-            for field in required_fields:
-                assert field in slide, f"Missing field {field} in slide"
-        print(f"  ✅ Data validation: All required fields present")
-        
-        print("\n🎉 All export functionality tests passed!")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Export functionality test failed: {str(e)}")
-        traceback.print_exc()
-        return False
+    print("\n🧪 Testing Export Functionality...")
+    
+    # Test JSON serialization
+    sample_slides = [
+        {
+            "title": "Traffic Overview",
+            "content": "Test content",
+            "sql": "SELECT COUNT(*) FROM traffic_data",
+            "data": [{"total_records": 150000}],
+            "metadata": {"confidence": 0.95}
+        },
+        {
+            "title": "Peak Hours",
+            "content": "Peak analysis",
+            "sql": "SELECT HOUR(timestamp) FROM traffic_data",
+            "data": [{"hour": 8, "count": 12500}],
+            "metadata": {"confidence": 0.88}
+        }
+    ]
+    
+    # Test JSON export
+    json_data = _dumps(sample_slides)
+    assert len(json_data) > 0, "JSON serialization failed"
+    print(f"  ✅ JSON export: {len(json_data)} characters")
+
+    # Test JSON parsing
+    parsed_data = _loads(json_data)
+    assert len(parsed_data) == 2, "JSON parsing failed"
+    print(f"  ✅ JSON parsing: {len(parsed_data)} slides recovered")
+    
+    # Test data validation
+    for slide in parsed_data:
+        required_fields = ["title", "content", "sql", "data", "metadata"]
+        for field in required_fields:
+            assert field in slide, f"Missing field {field} in slide"
+    print(f"  ✅ Data validation: All required fields present")
+    
+    print("\n🎉 All export functionality tests passed!")
+    return True
+    
+
+def _run_suite_captured(test_func):
+    """Run one suite with stdout captured so parallel runs don't interleave"""
+    buffer = io.StringIO()
+    with redirect_stdout(buffer):
+        result = test_func()
+    return result, buffer.getvalue()
 
 def main():
     """Run all tests"""
     print("🚀 Starting Snowflake Cortex AI Slide Builder Tests")
     print("=" * 60)
-    
+
     tests = [
         ("Cortex Integration", test_cortex_integration),
         ("Slide Builder", test_slide_builder),
         ("Data Processing", test_data_processing),
         ("Export Functionality", test_export_functionality)
     ]
-    
+
     passed = 0
     total = len(tests)
-    
-    for test_name, test_func in tests:
-        print(f"\n{'='*20} {test_name} {'='*20}")
-        if test_func():
-            passed += 1
-        else:
-            print(f"❌ {test_name} failed")
-    
+
+    # The suites are independent and each pays its own heavy import/init
+    # cost, so run one interpreter per suite and replay the captured output
+    # in the original order
+    with ProcessPoolExecutor(max_workers=total) as executor:
+        futures = [executor.submit(_run_suite_captured, test_func)
+                   for _, test_func in tests]
+        for (test_name, _), future in zip(tests, futures):
+            print(f"\n{'='*20} {test_name} {'='*20}")
+            ok, output = future.result()
+            print(output, end="")
+            if ok:
+                passed += 1
+            else:
+                print(f"❌ {test_name} failed")
+
     print("\n" + "="*60)
     print(f"🏁 Test Results: {passed}/{total} tests passed")
     